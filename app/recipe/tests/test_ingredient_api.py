@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -9,11 +9,12 @@ from core.models import Ingredient
 
 from recipe.serializers import IngredientSerializer
 
+User = get_user_model()
 
 INGREDIENT_URL = reverse('recipe:ingredient-list')
 
 
-class PublicIngredientsApiTests(TestCase):
+class PublicIngredientsApiTests(SimpleTestCase):
     """Test the publicly available ingredients API"""
 
     def setUp(self):
@@ -29,13 +30,25 @@ class PublicIngredientsApiTests(TestCase):
 class PrivateIngredientsApiTests(TestCase):
     """Test private Ingredients API"""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             'test@test.com',
             'test1'
         )
-        self.client.force_authenticate(self.user)
+        cls.no_auth_user = User.objects.create_user(
+            'no_auth_user@test.com',
+            'test'
+        )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._shared_client = APIClient()
+        cls._shared_client.force_authenticate(cls.user)
+
+    def setUp(self):
+        self.client = self._shared_client
 
     def test_retrieve_ingredient_list(self):
         """Test retrieving a list of ingredients"""
@@ -58,13 +71,8 @@ class PrivateIngredientsApiTests(TestCase):
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients for the authenticated user are returend"""
-        no_auth_user = get_user_model().objects.create_user(
-            'no_auth_user@test.com',
-            'test'
-        )
-
         Ingredient.objects.create(
-            user=no_auth_user,
+            user=self.no_auth_user,
             name='Vinegar'
         )
         ingredient = Ingredient.objects.create(
@@ -1,3 +1,5 @@
+from django.db.models import Prefetch
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
@@ -66,13 +68,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
 
-        return queryset.filter(user=self.request.user)
+        if self.action == 'retrieve':
+            # The detail serializer only renders id and name, so skip the
+            # remaining columns when prefetching
+            prefetches = (
+                Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.only('id', 'name')
+                ),
+            )
+        else:
+            prefetches = ('tags', 'ingredients')
+
+        return queryset.filter(
+            user=self.request.user
+        ).select_related(
+            'user'
+        ).prefetch_related(
+            *prefetches
+        ).order_by('-id')
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
-        elif self.action == 'upload-image':
+        elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
         return self.serializer_class